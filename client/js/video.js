@@ -226,14 +226,15 @@ function sendFrames(socket) {
                 // Draw the current video frame to the temp canvas
                 tempCtx.drawImage(videoElement, 0, 0, tempCanvas.width, tempCanvas.height);
                 
-                // Convert to data URL and send to server
-                const imageData = tempCanvas.toDataURL('image/jpeg', 0.7);
-                
                 // Add to processing buffer (to track pending frames)
                 processingBuffer.push(now);
                 
-                // Send frame to server
-                socket.emit('video_frame', { frame: imageData });
+                // Encode as JPEG and send the raw bytes as a binary frame
+                tempCanvas.toBlob((blob) => {
+                    if (blob) {
+                        socket.emit('video_frame', blob);
+                    }
+                }, 'image/jpeg', 0.6);
             } catch (e) {
                 console.error('Error processing video frame:', e);
             }
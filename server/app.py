@@ -1,5 +1,8 @@
 import os
 import time
+import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor
 import cv2
 import numpy as np
 import base64
@@ -8,6 +11,7 @@ from flask_socketio import SocketIO
 import json
 from motion_tracking import process_frame
 from utils import BirdPhysics, World
+from common import STATE_NAMES, STATE_NONE
 
 # Get the absolute path to the client directory
 client_dir = os.path.abspath(os.path.join(os.path.dirname(__file__), '..', 'client'))
@@ -15,29 +19,45 @@ client_dir = os.path.abspath(os.path.join(os.path.dirname(__file__), '..', 'clie
 app = Flask(__name__, 
     static_folder=client_dir,
     template_folder=client_dir)
-socketio = SocketIO(app, cors_allowed_origins="*")
+# Plain threads: pose inference releases the GIL, so it runs alongside socket I/O.
+# Long-polling payloads over 256 bytes are compressed, websocket frames are not
+socketio = SocketIO(app, async_mode='threading', cors_allowed_origins="*",
+                    compression_threshold=256)
+
+# Frame stats go through logging, silent unless debug logging is configured
+logger = logging.getLogger(__name__)
+logger.addHandler(logging.NullHandler())
 
 # Global variables
 frame_count = 0
-last_process_time = time.time()
+stats_start_time = time.time()
 fps_limit = 15  # Maximum FPS to process
 bird_physics = BirdPhysics()
 world = World()
 
-# Process base64 image data
-def process_image(base64_image):
+# Decoding and pose estimation run off the Socket.IO workers, on a single
+# thread because the pose network and tracking state are not thread-safe
+EXECUTOR = ThreadPoolExecutor(max_workers=1)
+
+# Only the most recent frame is kept, stale frames are dropped before decoding
+latest_frame = {'data': None, 'sid': None}
+frame_lock = threading.Lock()
+frame_in_flight = False
+
+# Decode a JPEG frame sent by the client
+def decode_frame(data):
     try:
-        # Extract the base64 encoded binary data from the input string
-        image_data = base64_image.split(',')[1]
-        # Decode base64 string
-        image_bytes = base64.b64decode(image_data)
-        # Convert to numpy array
-        nparr = np.frombuffer(image_bytes, np.uint8)
-        # Decode image
+        # Fall back to the old base64 data URL payload if a client still sends it
+        if isinstance(data, dict):
+            data = data.get('frame')
+        if isinstance(data, str):
+            data = base64.b64decode(data.split(',')[-1])
+        # Raw JPEG bytes go straight to the decoder
+        nparr = np.frombuffer(data, np.uint8)
         img = cv2.imdecode(nparr, cv2.IMREAD_COLOR)
         return img
     except Exception as e:
-        print(f"Error processing image: {e}")
+        print(f"Error decoding frame: {e}")
         return None
 
 @app.route('/')
@@ -64,67 +84,121 @@ def handle_disconnect():
 
 @socketio.on('video_frame')
 def handle_video_frame(data):
-    global frame_count, last_process_time, bird_physics, world
+    global frame_in_flight
     
-    # Throttle processing to save CPU
-    current_time = time.time()
-    time_diff = current_time - last_process_time
+    # Just latch the frame, the executor picks up whatever is newest when it is free
+    with frame_lock:
+        latest_frame['data'] = data
+        latest_frame['sid'] = request.sid
+        idle = not frame_in_flight
+        frame_in_flight = True
     
-    if time_diff < 1.0/fps_limit:
+    if idle:
+        submit_latest_frame()
+
+def submit_latest_frame():
+    """Hand the newest frame to the executor, or go idle if there is none"""
+    global frame_in_flight
+    
+    with frame_lock:
+        data, sid = latest_frame['data'], latest_frame['sid']
+        latest_frame['data'] = None
+        frame_in_flight = data is not None
+    
+    if data is None:
         return
     
+    started = time.time()
+    try:
+        future = EXECUTOR.submit(process_video_frame, data)
+    except Exception as e:
+        print(f"Error submitting frame: {e}")
+        go_idle()
+        return
+    future.add_done_callback(lambda f: start_frame_result(sid, f, started))
+
+def start_frame_result(sid, future, started):
+    """Handle a finished frame on a background task, going idle if that fails"""
+    try:
+        socketio.start_background_task(handle_frame_result, sid, future, started)
+    except Exception as e:
+        print(f"Error starting frame result task: {e}")
+        go_idle()
+
+def go_idle():
+    """Clear the in-flight flag so the next incoming frame gets submitted again"""
+    global frame_in_flight
+    
+    with frame_lock:
+        frame_in_flight = False
+
+def handle_frame_result(sid, future, started):
+    """Send a processed frame to its client and move on to the next frame"""
     try:
-        # Process the frame
-        frame = process_image(data['frame'])
+        try:
+            response_data = future.result()
+            if response_data is not None:
+                # Send response back to the client that sent the frame
+                socketio.emit('motion_data', response_data, to=sid)
+        except Exception as e:
+            print(f"Error in process_video_frame: {e}")
+            socketio.emit('error', {'message': f'Server error: {str(e)}'}, to=sid)
         
-        if frame is not None:
-            # Get movement commands and keypoints from the pose estimation
-            commands, keypoints = process_frame(frame)
-            
-            # Update bird physics based on commands
-            bird_physics.update(commands)
-            
-            # Update world state
-            world_data = world.update(bird_physics)
-            
-            # Send data back to client
-            response_data = {
-                'position': bird_physics.get_position(),
-                'rotation': bird_physics.get_rotation(),
-                'state': commands.get('state', 'none'),
-                'world': world_data,
-                'bird_data': {
-                    'energy': bird_physics.energy,
-                    'speed': bird_physics.speed,
-                    'height': bird_physics.position[1]
-                }
-            }
-            
-            # Include keypoints for skeleton visualization
-            client_keypoints = []
-            for kp in keypoints:
-                if kp is not None:
-                    client_keypoints.append({"x": float(kp[0]), "y": float(kp[1])})
-                else:
-                    client_keypoints.append(None)
-                    
-            response_data['keypoints'] = client_keypoints
-            
-            # Send response to client
-            socketio.emit('motion_data', response_data)
-            
-            # Update frame processing stats
-            frame_count += 1
-            last_process_time = current_time
-            
-            # Every 30 frames, print stats
-            if frame_count % 30 == 0:
-                fps = 30 / (current_time - (last_process_time - 30/fps_limit))
-                print(f"Processing at {fps:.1f} FPS")
+        # Throttle processing to save CPU, never more often than fps_limit
+        socketio.sleep(max(0, 1.0/fps_limit - (time.time() - started)))
+    finally:
+        # Always move on, a stuck in-flight flag would stop processing for every client
+        submit_latest_frame()
+
+def process_video_frame(data):
+    """Run pose estimation and physics for one frame and build the client response"""
+    global frame_count, stats_start_time, bird_physics, world
     
-    except Exception as e:
-        print(f"Error in handle_video_frame: {e}")
-        socketio.emit('error', {'message': f'Server error: {str(e)}'})
+    current_time = time.time()
+    
+    # Process the frame
+    frame = decode_frame(data)
+    
+    if frame is None:
+        return None
+    
+    # Get movement commands and keypoints from the pose estimation
+    commands, keypoints = process_frame(frame)
+    
+    # Update bird physics based on commands
+    bird_physics.update(commands)
+    
+    # Update world state
+    world_data = world.update(bird_physics)
+    
+    # Send data back to client
+    response_data = {
+        'position': bird_physics.get_position(),
+        'rotation': bird_physics.get_rotation(),
+        'state': STATE_NAMES[commands.get('state', STATE_NONE)],
+        'world': world_data,
+        'bird_data': {
+            'energy': bird_physics.energy,
+            'speed': bird_physics.speed,
+            'height': bird_physics.position[1]
+        }
+    }
+    
+    # Include keypoints for skeleton visualization, NaN rows are undetected
+    response_data['keypoints'] = [None if x != x else {"x": x, "y": y}
+                                  for x, y in keypoints.tolist()]
+    
+    # Update frame processing stats
+    frame_count += 1
+    
+    # Every 30 frames, log the processing rate over those frames
+    if frame_count % 30 == 0:
+        if logger.isEnabledFor(logging.DEBUG):
+            fps = 30 / (current_time - stats_start_time)
+            logger.debug("Processing at %.1f FPS", fps)
+        stats_start_time = current_time
+    
+    return response_data
 
 if __name__ == '__main__':
     print("Starting Bird Movement Game server...")
@@ -143,4 +217,5 @@ if __name__ == '__main__':
         print("A fallback method using HOG person detector will be used until the model files are available.")
     
     # Start the server
-    socketio.run(app, host='0.0.0.0', port=5000, debug=True)
\ No newline at end of file
+    socketio.run(app, host='0.0.0.0', port=5000, debug=False, use_reloader=False,
+                 allow_unsafe_werkzeug=True)
\ No newline at end of file
@@ -0,0 +1,17 @@
+import os
+
+# Compiled kernels are cached across restarts
+os.environ.setdefault("NUMBA_CACHE_DIR", os.path.expanduser("~/.numba_cache"))
+
+try:
+    from numba import njit
+except ImportError:
+    # Without numba the kernels simply run as regular Python functions
+    def njit(*args, **kwargs):
+        return lambda func: func
+
+# Movement states and turn directions as integer codes, shared by the pose
+# kernel that produces them and the physics kernel that consumes them
+STATE_NONE, STATE_GLIDE, STATE_DIVE, STATE_GAIN_HEIGHT = 0, 1, 2, 3
+STATE_NAMES = ("none", "glide", "dive", "gain_height")
+TURN_NONE, TURN_LEFT, TURN_RIGHT = 0, 1, 2
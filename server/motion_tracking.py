@@ -1,19 +1,63 @@
+import os
 import cv2
 import numpy as np
 import math
-from collections import deque
+from common import (njit, STATE_NONE, STATE_GLIDE, STATE_DIVE, STATE_GAIN_HEIGHT,
+                    TURN_NONE, TURN_LEFT, TURN_RIGHT)
 
 # Initialize OpenCV's Deep Neural Network (DNN) module for pose detection
 # We'll use the OpenPose model which is supported by OpenCV
-try:
-    # Load the pose detection model
-    protoFile = "server/models/pose/pose_deploy_linevec.prototxt"
-    weightsFile = "server/models/pose/pose_iter_440000.caffemodel"
-    net = cv2.dnn.readNetFromCaffe(protoFile, weightsFile)
-    modelLoaded = True
-except Exception as e:
-    print(f"Error loading pose model: {e}")
-    modelLoaded = False
+protoFile = "server/models/pose/pose_deploy_linevec.prototxt"
+weightsFile = "server/models/pose/pose_iter_440000.caffemodel"
+net = None
+
+def load_pose_model():
+    """Load the pose network once per process and keep it for every frame"""
+    global net
+    
+    try:
+        net = cv2.dnn.readNetFromCaffe(protoFile, weightsFile)
+        return True
+    except Exception as e:
+        print(f"Error loading pose model: {e}")
+        return False
+
+# Optional int8 MoveNet model run through ONNX Runtime, used instead of
+# OpenCV DNN when both onnxruntime and the model file are available
+movenetFile = "server/models/pose/movenet_singlepose_lightning_int8.onnx"
+movenetSize = 192
+ort_session = None
+
+def load_movenet_model():
+    """Create the ONNX Runtime session for MoveNet and its reusable input buffers"""
+    global ort_session, movenet_input_name, movenet_resized, movenet_rgb, movenet_input
+    
+    try:
+        import onnxruntime as ort
+        ort_session = ort.InferenceSession(movenetFile, providers=['CPUExecutionProvider'])
+    except Exception as e:
+        print(f"Error loading MoveNet model: {e}")
+        return False
+    
+    model_input = ort_session.get_inputs()[0]
+    movenet_input_name = model_input.name
+    input_dtype = np.int32 if model_input.type == 'tensor(int32)' else np.uint8
+    movenet_resized = np.empty((movenetSize, movenetSize, 3), dtype=np.uint8)
+    movenet_rgb = np.empty_like(movenet_resized)
+    movenet_input = np.empty((1, movenetSize, movenetSize, 3), dtype=input_dtype)
+    return True
+
+movenetLoaded = os.path.exists(movenetFile) and load_movenet_model()
+
+# The OpenPose network is only read when MoveNet is not there to handle frames
+modelLoaded = not movenetLoaded and load_pose_model()
+
+# Only try to fetch missing model files once, not on every frame
+download_attempted = False
+
+# HOG person detector for the fallback mode, built once rather than per frame
+hog = cv2.HOGDescriptor()
+hog.setSVMDetector(cv2.HOGDescriptor_getDefaultPeopleDetector())
 
 # Constants for OpenPose
 BODY_PARTS = {
@@ -25,16 +69,40 @@ BODY_PARTS = {
     "REye": 14, "LEye": 15, "REar": 16, "LEar": 17
 }
 
-# Store previous positions for velocity calculation
-prev_wrist_positions = {
-    'left': deque(maxlen=5),
-    'right': deque(maxlen=5)
-}
+# MoveNet (COCO) keypoint index for each OpenPose body part, the neck is derived
+MOVENET_PARTS = (0, None, 6, 8, 10, 5, 7, 9, 12, 14, 16, 11, 13, 15, 2, 1, 4, 3)
+MOVENET_TARGETS = np.array([i for i, part in enumerate(MOVENET_PARTS) if part is not None])
+MOVENET_SOURCES = np.array([part for part in MOVENET_PARTS if part is not None])
+
+# Landmarks fed to _derive_commands, in the row order it expects. Resolved to
+# an index array once so each frame is a single take() without name lookups
+TRACKED_PARTS = np.array([BODY_PARTS[name] for name in (
+    "LShoulder", "RShoulder", "LElbow", "RElbow",
+    "LWrist", "RWrist", "LHip", "RHip", "Nose")], dtype=np.intp)
+NECK, LSHOULDER, RSHOULDER = BODY_PARTS["Neck"], BODY_PARTS["LShoulder"], BODY_PARTS["RShoulder"]
+
+# Network input size, with buffers allocated once and reused for every frame
+inWidth = 368
+inHeight = 368
+resized_frame = np.empty((inHeight, inWidth, 3), dtype=np.uint8)
+input_blob = np.empty((1, 3, inHeight, inWidth), dtype=np.float32)
+
+# Temporal cache: while frames stay visually identical the last detected keypoints
+# are reused, with a full detection still forced every cache_refresh_interval frames.
+# Commands are always derived again so wrist velocity sees the unchanged pose.
+cache_refresh_interval = 8
+thumbnail_size = (32, 24)  # Grayscale thumbnail compared between frames
+pixel_change_threshold = 12  # Max thumbnail pixel change for two frames to count as identical
+last_thumbnail = None
+last_keypoints = None
+cache_counter = 0
+
+# Wrist heights from the previous tracked frame for velocity calculation
+prev_left_wrist_y = None
+prev_right_wrist_y = None
 
 def download_model_files():
     """Download OpenPose model files if not present"""
-    import os
-    
     # Create models directory if it doesn't exist
     os.makedirs("server/models/pose", exist_ok=True)
     
@@ -64,187 +132,153 @@ def download_model_files():
     
     return True
 
+def frame_thumbnail(frame):
+    """Small grayscale thumbnail of a frame, area averaging smooths out sensor noise"""
+    small = cv2.resize(frame, thumbnail_size, interpolation=cv2.INTER_AREA)
+    return cv2.cvtColor(small, cv2.COLOR_BGR2GRAY)
+
 def process_frame(frame):
     """Process a frame and return commands and keypoints"""
     # Check if model is loaded, if not try a fallback method
-    global modelLoaded
+    global modelLoaded, download_attempted
     
-    if not modelLoaded:
-        modelLoaded = download_model_files()
+    if not movenetLoaded and not modelLoaded:
+        if not download_attempted:
+            download_attempted = True
+            modelLoaded = download_model_files() and load_pose_model()
         
         if not modelLoaded:
             # Fallback to simpler HOG-based detector
             return process_frame_hog_fallback(frame)
     
-    # Prepare frame for detection
-    frameWidth = frame.shape[1]
-    frameHeight = frame.shape[0]
-    
-    # Convert frame to blob for neural network
-    inWidth = 368
-    inHeight = 368
-    inpBlob = cv2.dnn.blobFromImage(frame, 1.0 / 255, (inWidth, inHeight), (0, 0, 0), swapRB=False, crop=False)
+    keypoints = detect_keypoints(frame)
+    return derive_commands(keypoints), keypoints
+
+def detect_keypoints(frame):
+    """Return the frame's keypoints, skipping detection for unchanged frames"""
+    global last_thumbnail, last_keypoints, cache_counter
+    
+    thumbnail = frame_thumbnail(frame)
+    cache_counter += 1
+    
+    if (last_keypoints is not None and cache_counter % cache_refresh_interval != 0 and
+            cv2.absdiff(thumbnail, last_thumbnail).max() <= pixel_change_threshold):
+        return last_keypoints
+    
+    last_thumbnail = thumbnail
+    if movenetLoaded:
+        last_keypoints = detect_keypoints_movenet(frame)
+    else:
+        last_keypoints = detect_keypoints_openpose(frame)
+    return last_keypoints
+
+def derive_commands(keypoints):
+    """Turn an (18, 2) keypoint array into movement commands"""
+    global prev_left_wrist_y, prev_right_wrist_y
+    
+    # Initialize commands, states and turns are integer codes from common
+    commands = {"state": STATE_NONE}
+    
+    # Gather the tracked landmarks in kernel order with a single pass over the keypoints
+    pts = keypoints.take(TRACKED_PARTS, axis=0)
+    found = ~np.isnan(pts[:, 0])
+    
+    # If not enough keypoints detected (shoulders, elbows and wrists), return early
+    if not found[:6].all():
+        return commands
+    
+    # Missing landmarks are zero for the compiled kernel and flagged instead
+    np.nan_to_num(pts, copy=False)
+    has_hips = bool(found[6] and found[7])
+    has_nose = bool(found[8])
+    
+    # Previous wrist heights for the flapping velocity, then remember the current ones
+    has_prev = prev_left_wrist_y is not None
+    prev_left_y = prev_left_wrist_y if has_prev else 0.0
+    prev_right_y = prev_right_wrist_y if has_prev else 0.0
+    prev_left_wrist_y, prev_right_wrist_y = float(pts[4, 1]), float(pts[5, 1])
+    
+    (state, turn, turn_angle, dive_intensity,
+     flap, flap_intensity, height_gain) = _derive_commands(
+        pts, has_hips, has_nose, has_prev, prev_left_y, prev_right_y)
+    
+    # Copy the kernel's results into the command dict
+    commands["state"] = state
+    if turn != TURN_NONE:
+        commands["turn"] = turn
+        commands["turn_angle"] = turn_angle
+    if state == STATE_DIVE:
+        commands["dive_intensity"] = dive_intensity
+    if flap:
+        commands["flap"] = True
+        commands["flap_intensity"] = flap_intensity
+    if state == STATE_GAIN_HEIGHT:
+        commands["height_gain"] = height_gain
+    
+    return commands
+
+def detect_keypoints_openpose(frame):
+    """Run the OpenPose network and return an (18, 2) keypoint array in BODY_PARTS order"""
+    # Downscale into the reused buffer, then write the 0-1 scaled NCHW blob in place
+    cv2.resize(frame, (inWidth, inHeight), dst=resized_frame)
+    np.multiply(resized_frame.transpose(2, 0, 1), 1.0 / 255, out=input_blob[0])
     
     # Set the blob as input to the network
-    net.setInput(inpBlob)
+    net.setInput(input_blob)
     
     # Forward pass through the network
     output = net.forward()
     
     # Process the output to get keypoints
-    keypoints = []
-    detected_keypoints = {}
     confidence_threshold = 0.1
-    
-    # Extract the keypoints
-    for i in range(len(BODY_PARTS)):
-        # Confidence map for bodypart
-        probMap = output[0, i, :, :]
-        probMap = cv2.resize(probMap, (frameWidth, frameHeight))
-        
-        # Find global maxima of the probability map
-        minVal, prob, minLoc, point = cv2.minMaxLoc(probMap)
-        
-        if prob > confidence_threshold:
-            # Normalize coordinates
-            x = point[0] / frameWidth
-            y = point[1] / frameHeight
-            
-            # Store keypoint
-            keypoints.append((x, y))
-            detected_keypoints[i] = (x, y)
-        else:
-            # If keypoint not detected, add None
-            keypoints.append(None)
-    
-    # Map keypoints for easy access
-    nose = detected_keypoints.get(BODY_PARTS["Nose"])
-    neck = detected_keypoints.get(BODY_PARTS["Neck"])
-    left_shoulder = detected_keypoints.get(BODY_PARTS["LShoulder"])
-    right_shoulder = detected_keypoints.get(BODY_PARTS["RShoulder"])
-    left_elbow = detected_keypoints.get(BODY_PARTS["LElbow"])
-    right_elbow = detected_keypoints.get(BODY_PARTS["RElbow"])
-    left_wrist = detected_keypoints.get(BODY_PARTS["LWrist"])
-    right_wrist = detected_keypoints.get(BODY_PARTS["RWrist"])
-    left_hip = detected_keypoints.get(BODY_PARTS["LHip"])
-    right_hip = detected_keypoints.get(BODY_PARTS["RHip"])
-    
-    # Initialize commands
-    commands = {"state": "none"}
-    
-    # If not enough keypoints detected, return early
-    if not all([left_shoulder, right_shoulder, left_elbow, right_elbow, left_wrist, right_wrist]):
-        return commands, keypoints
-    
-    # Store current wrist positions for velocity calculation
-    if left_wrist:
-        prev_wrist_positions['left'].append(left_wrist)
-    if right_wrist:
-        prev_wrist_positions['right'].append(right_wrist)
-    
-    # Calculate shoulder width for normalization
-    shoulder_width = 0
-    if left_shoulder and right_shoulder:
-        shoulder_width = math.sqrt((right_shoulder[0] - left_shoulder[0])**2 + 
-                                  (right_shoulder[1] - left_shoulder[1])**2)
-    
-    # Gliding: Arms straight out horizontally
-    if left_shoulder and left_elbow and left_wrist and right_shoulder and right_elbow and right_wrist:
-        left_arm_angle = calculate_angle_points(left_shoulder, left_elbow, left_wrist)
-        right_arm_angle = calculate_angle_points(right_shoulder, right_elbow, right_wrist)
-        
-        # Check if arms are straight (close to 180 degrees)
-        arms_straight = abs(left_arm_angle - 180) < 25 and abs(right_arm_angle - 180) < 25
-        
-        # Check if arms are horizontal
-        left_arm_horizontal = abs(left_shoulder[1] - left_elbow[1]) < 0.1
-        right_arm_horizontal = abs(right_shoulder[1] - right_elbow[1]) < 0.1
-        
-        if arms_straight and left_arm_horizontal and right_arm_horizontal:
-            commands["state"] = "glide"
-    
-    # Turning: Body angled to the side
-    if left_shoulder and right_shoulder and left_hip and right_hip:
-        torso_angle = calculate_torso_angle_points(left_shoulder, right_shoulder, left_hip, right_hip)
-        if torso_angle > 15:
-            commands["turn"] = "right"
-            commands["turn_angle"] = min(torso_angle, 60)
-        elif torso_angle < -15:
-            commands["turn"] = "left"
-            commands["turn_angle"] = min(abs(torso_angle), 60)
-    
-    # Diving: Bending forward with arms slightly down
-    if nose and left_shoulder and right_shoulder and left_hip and right_hip:
-        shoulder_mid_y = (left_shoulder[1] + right_shoulder[1]) / 2
-        torso_forward_angle = calculate_forward_angle_points(
-            nose, shoulder_mid_y, left_hip[1], right_hip[1]
-        )
-        
-        # Arms angled down from shoulders
-        arms_down = (left_wrist and left_elbow and left_shoulder and
-                    left_wrist[1] > left_elbow[1] > left_shoulder[1] and
-                    right_wrist and right_elbow and right_shoulder and
-                    right_wrist[1] > right_elbow[1] > right_shoulder[1])
-        
-        if torso_forward_angle > 30 and arms_down:
-            commands["state"] = "dive"
-            commands["dive_intensity"] = min(torso_forward_angle / 60, 1.0)
-    
-    # Flapping: Detect vertical movement of arms
-    if len(prev_wrist_positions['left']) >= 2 and len(prev_wrist_positions['right']) >= 2:
-        # Calculate vertical velocity
-        left_wrist_velocity = prev_wrist_positions['left'][-1][1] - prev_wrist_positions['left'][-2][1]
-        right_wrist_velocity = prev_wrist_positions['right'][-1][1] - prev_wrist_positions['right'][-2][1]
-        
-        # Normalize by shoulder width
-        if shoulder_width > 0:
-            left_wrist_velocity = left_wrist_velocity / shoulder_width
-            right_wrist_velocity = right_wrist_velocity / shoulder_width
-        
-        # Detect flapping based on arm motion and position
-        flapping_threshold = 0.02
-        arms_above_shoulders = (left_wrist and left_shoulder and left_wrist[1] < left_shoulder[1] and
-                               right_wrist and right_shoulder and right_wrist[1] < right_shoulder[1])
-        
-        is_flapping = (abs(left_wrist_velocity) > flapping_threshold and 
-                      abs(right_wrist_velocity) > flapping_threshold) or arms_above_shoulders
-        
-        if is_flapping:
-            commands["flap"] = True
-            
-            # Calculate flap intensity
-            arm_height = 0
-            if left_shoulder and left_wrist and right_shoulder and right_wrist:
-                arm_height = ((left_shoulder[1] - left_wrist[1]) + (right_shoulder[1] - right_wrist[1])) / 2
-            
-            velocity_component = (abs(left_wrist_velocity) + abs(right_wrist_velocity)) / 2
-            commands["flap_intensity"] = min(arm_height * 3 + velocity_component * 10, 1.0)
-    
-    # Gaining More Height: Flapping while angling torso upward
-    if "flap" in commands and nose and left_shoulder and right_shoulder and left_hip and right_hip:
-        shoulder_mid_y = (left_shoulder[1] + right_shoulder[1]) / 2
-        torso_forward_angle = calculate_forward_angle_points(
-            nose, shoulder_mid_y, left_hip[1], right_hip[1]
-        )
-        
-        if torso_forward_angle < -20:
-            commands["state"] = "gain_height"
-            commands["height_gain"] = min(abs(torso_forward_angle) / 40, 1.0)
-    
-    return commands, keypoints
+    num_parts = len(BODY_PARTS)
+    
+    # Find the global maximum of every confidence map at once on the native heatmap grid
+    heatmaps = output[0, :num_parts]
+    grid_height, grid_width = heatmaps.shape[1:]
+    flat = heatmaps.reshape(num_parts, -1)
+    peak_indices = flat.argmax(axis=1)
+    probs = flat[np.arange(num_parts), peak_indices]
+    peak_y, peak_x = np.divmod(peak_indices, grid_width)
+    
+    # Normalize coordinates (cell centers), undetected keypoints become NaN
+    keypoints = np.empty((num_parts, 2), dtype=np.float32)
+    keypoints[:, 0] = (peak_x + 0.5) / grid_width
+    keypoints[:, 1] = (peak_y + 0.5) / grid_height
+    keypoints[probs <= confidence_threshold] = np.nan
+    
+    return keypoints
+
+def detect_keypoints_movenet(frame):
+    """Run MoveNet through ONNX Runtime and return an (18, 2) keypoint array in BODY_PARTS order"""
+    # Resize and convert to RGB in the reused buffers, MoveNet outputs normalized coordinates
+    cv2.resize(frame, (movenetSize, movenetSize), dst=movenet_resized)
+    cv2.cvtColor(movenet_resized, cv2.COLOR_BGR2RGB, dst=movenet_rgb)
+    np.copyto(movenet_input[0], movenet_rgb)
+    
+    # Output is (1, 1, 17, 3) with rows of (y, x, score)
+    output = ort_session.run(None, {movenet_input_name: movenet_input})[0]
+    points = output.reshape(17, 3)
+    confidence_threshold = 0.3
+    
+    # Swap to (x, y), undetected keypoints become NaN
+    keypoints = np.full((len(BODY_PARTS), 2), np.nan, dtype=np.float32)
+    detected = points[MOVENET_SOURCES, 2] > confidence_threshold
+    keypoints[MOVENET_TARGETS[detected]] = points[MOVENET_SOURCES[detected]][:, 1::-1]
+    
+    # OpenPose has a neck keypoint, MoveNet doesn't: use the shoulder midpoint
+    keypoints[NECK] = (keypoints[LSHOULDER] + keypoints[RSHOULDER]) / 2
+    
+    return keypoints
 
 def process_frame_hog_fallback(frame):
     """Fallback method using HOG detector when OpenPose is not available"""
-    # Initialize HOG detector
-    hog = cv2.HOGDescriptor()
-    hog.setSVMDetector(cv2.HOGDescriptor_getDefaultPeopleDetector())
-    
     # Detect people in the frame
     boxes, weights = hog.detectMultiScale(frame, winStride=(8, 8), padding=(4, 4), scale=1.05)
     
     # Initialize commands and keypoints
-    commands = {"state": "none"}
-    keypoints = [None] * 9  # 9 keypoints to match expected output
+    commands = {"state": STATE_NONE}
+    keypoints = np.full((9, 2), np.nan, dtype=np.float32)  # 9 keypoints to match expected output
     
     if len(boxes) == 0:
         return commands, keypoints
@@ -285,7 +319,7 @@ def process_frame_hog_fallback(frame):
     right_hip_y = (y + 2*h/3) / frame_height
     
     # Assemble keypoints
-    keypoints = [
+    keypoints = np.array([
         (left_shoulder_x, left_shoulder_y),    # Left shoulder
         (right_shoulder_x, right_shoulder_y),  # Right shoulder
         (left_elbow_x, left_elbow_y),          # Left elbow
@@ -295,7 +329,7 @@ def process_frame_hog_fallback(frame):
         (left_hip_x, left_hip_y),              # Left hip
         (right_hip_x, right_hip_y),            # Right hip
         (nose_x, nose_y)                       # Nose
-    ]
+    ], dtype=np.float32)
     
     # Simple movement detection based on position
     # This is a very simplified approximation
@@ -303,51 +337,124 @@ def process_frame_hog_fallback(frame):
     # Detect if arms are outstretched (gliding)
     arms_horizontal = abs(left_shoulder_y - left_elbow_y) < 0.05 and abs(right_shoulder_y - right_elbow_y) < 0.05
     if arms_horizontal:
-        commands["state"] = "glide"
+        commands["state"] = STATE_GLIDE
     
     # Detect turning
     torso_center_x = (left_shoulder_x + right_shoulder_x) / 2
     if abs(torso_center_x - 0.5) > 0.1:
         if torso_center_x < 0.5:
-            commands["turn"] = "left"
+            commands["turn"] = TURN_LEFT
             commands["turn_angle"] = min(abs(0.5 - torso_center_x) * 100, 60)
         else:
-            commands["turn"] = "right"
+            commands["turn"] = TURN_RIGHT
             commands["turn_angle"] = min(abs(torso_center_x - 0.5) * 100, 60)
     
     return commands, keypoints
 
-def calculate_angle_points(p1, p2, p3):
-    """Calculate angle between three points (in degrees)"""
-    a = math.sqrt((p2[0] - p1[0])**2 + (p2[1] - p1[1])**2)
-    b = math.sqrt((p3[0] - p2[0])**2 + (p3[1] - p2[1])**2)
-    c = math.sqrt((p3[0] - p1[0])**2 + (p3[1] - p1[1])**2)
+@njit(cache=True, fastmath=True)
+def _elbow_angle(sx, sy, ex, ey, wx, wy):
+    """Calculate the angle at the elbow between upper arm and forearm (in degrees)"""
+    ax, ay = sx - ex, sy - ey
+    bx, by = wx - ex, wy - ey
+    norms = math.sqrt(ax * ax + ay * ay) * math.sqrt(bx * bx + by * by)
     
-    # Handle cases where points might be collinear
-    if a * b == 0:
-        return 0
+    # Handle cases where points overlap
+    if norms == 0:
+        return 0.0
     
-    cos_angle = (a**2 + b**2 - c**2) / (2 * a * b)
     # Clamp value to prevent domain errors due to floating point precision
-    cos_angle = max(min(cos_angle, 1.0), -1.0)
-    
-    angle = math.degrees(math.acos(cos_angle))
-    return angle
-
-def calculate_torso_angle_points(ls, rs, lh, rh):
-    """Calculate torso angle relative to vertical"""
-    shoulder_mid = ((ls[0] + rs[0]) / 2, (ls[1] + rs[1]) / 2)
-    hip_mid = ((lh[0] + rh[0]) / 2, (lh[1] + rh[1]) / 2)
-    return math.degrees(math.atan2(shoulder_mid[0] - hip_mid[0], shoulder_mid[1] - hip_mid[1]))
+    cos_angle = max(min((ax * bx + ay * by) / norms, 1.0), -1.0)
+    return math.degrees(math.acos(cos_angle))
 
-def calculate_forward_angle_points(nose, shoulder_mid_y, left_hip_y, right_hip_y):
-    """Calculate how much the upper body is leaning forward/backward"""
-    hip_mid_y = (left_hip_y + right_hip_y) / 2
+@njit(cache=True, fastmath=True)
+def _derive_commands(pts, has_hips, has_nose, has_prev, prev_left_y, prev_right_y):
+    """Derive movement commands from a (9, 2) landmark array
+    
+    Rows are ordered as left/right shoulder, left/right elbow, left/right
+    wrist, left/right hip and nose. Returns the state code, turn code, turn
+    angle, dive intensity, flap flag, flap intensity and height gain.
+    """
+    ls_x, ls_y = pts[0, 0], pts[0, 1]
+    rs_x, rs_y = pts[1, 0], pts[1, 1]
+    le_x, le_y = pts[2, 0], pts[2, 1]
+    re_x, re_y = pts[3, 0], pts[3, 1]
+    lw_x, lw_y = pts[4, 0], pts[4, 1]
+    rw_x, rw_y = pts[5, 0], pts[5, 1]
+    lh_x, lh_y = pts[6, 0], pts[6, 1]
+    rh_x, rh_y = pts[7, 0], pts[7, 1]
+    nose_y = pts[8, 1]
+    
+    state = STATE_NONE
+    turn = TURN_NONE
+    turn_angle = 0.0
+    dive_intensity = 0.0
+    flap = False
+    flap_intensity = 0.0
+    height_gain = 0.0
+    
+    # Calculate shoulder width for normalization
+    shoulder_width = math.sqrt((rs_x - ls_x) ** 2 + (rs_y - ls_y) ** 2)
+    
+    # Gliding: Arms straight out horizontally
+    left_arm_angle = _elbow_angle(ls_x, ls_y, le_x, le_y, lw_x, lw_y)
+    right_arm_angle = _elbow_angle(rs_x, rs_y, re_x, re_y, rw_x, rw_y)
+    arms_straight = abs(left_arm_angle - 180) < 25 and abs(right_arm_angle - 180) < 25
+    arms_horizontal = abs(ls_y - le_y) < 0.1 and abs(rs_y - re_y) < 0.1
+    if arms_straight and arms_horizontal:
+        state = STATE_GLIDE
+    
+    # Torso angle relative to vertical and how much it leans forward/backward
+    shoulder_mid_x = (ls_x + rs_x) / 2
+    shoulder_mid_y = (ls_y + rs_y) / 2
+    hip_mid_x = (lh_x + rh_x) / 2
+    hip_mid_y = (lh_y + rh_y) / 2
     torso_length = hip_mid_y - shoulder_mid_y
+    forward_angle = 0.0
+    if torso_length != 0:
+        forward_angle = 60 * (nose_y - shoulder_mid_y) / torso_length
+    
+    # Turning: Body angled to the side
+    if has_hips:
+        torso_angle = math.degrees(math.atan2(shoulder_mid_x - hip_mid_x, shoulder_mid_y - hip_mid_y))
+        if torso_angle > 15:
+            turn = TURN_RIGHT
+            turn_angle = min(torso_angle, 60.0)
+        elif torso_angle < -15:
+            turn = TURN_LEFT
+            turn_angle = min(abs(torso_angle), 60.0)
     
-    if torso_length == 0:
-        return 0
+    # Diving: Bending forward with arms slightly down
+    if has_nose and has_hips:
+        arms_down = lw_y > le_y > ls_y and rw_y > re_y > rs_y
+        if forward_angle > 30 and arms_down:
+            state = STATE_DIVE
+            dive_intensity = min(forward_angle / 60, 1.0)
+    
+    # Flapping: Detect vertical movement of arms
+    if has_prev:
+        left_wrist_velocity = lw_y - prev_left_y
+        right_wrist_velocity = rw_y - prev_right_y
+        
+        # Normalize by shoulder width
+        if shoulder_width > 0:
+            left_wrist_velocity = left_wrist_velocity / shoulder_width
+            right_wrist_velocity = right_wrist_velocity / shoulder_width
+        
+        # Detect flapping based on arm motion and position
+        flapping_threshold = 0.02
+        arms_above_shoulders = lw_y < ls_y and rw_y < rs_y
+        is_flapping = (abs(left_wrist_velocity) > flapping_threshold and
+                       abs(right_wrist_velocity) > flapping_threshold) or arms_above_shoulders
         
-    nose_forward = (nose[1] - shoulder_mid_y) / torso_length
-    # Convert to approximate angle: positive = leaning forward, negative = leaning backward
-    return 60 * nose_forward
\ No newline at end of file
+        if is_flapping:
+            flap = True
+            arm_height = ((ls_y - lw_y) + (rs_y - rw_y)) / 2
+            velocity_component = (abs(left_wrist_velocity) + abs(right_wrist_velocity)) / 2
+            flap_intensity = min(arm_height * 3 + velocity_component * 10, 1.0)
+    
+    # Gaining More Height: Flapping while angling torso upward
+    if flap and has_nose and has_hips and forward_angle < -20:
+        state = STATE_GAIN_HEIGHT
+        height_gain = min(abs(forward_angle) / 40, 1.0)
+    
+    return state, turn, turn_angle, dive_intensity, flap, flap_intensity, height_gain
@@ -0,0 +1,125 @@
+import math
+from common import (njit, STATE_GLIDE, STATE_DIVE, STATE_GAIN_HEIGHT,
+                    TURN_NONE, TURN_LEFT, TURN_RIGHT)
+
+@njit(cache=True, fastmath=True)
+def apply_physics_kernel(steps, state, turn, turn_angle,
+                         flap, flap_intensity, height_gain, dive_intensity,
+                         x, y, z, pitch, yaw, roll, yaw_sin, yaw_cos,
+                         mom_x, mom_y, mom_z, speed, energy, on_ground,
+                         gravity, max_speed, min_speed, glide_drag, dive_acceleration,
+                         lift_factor, turn_factor, energy_max, energy_recovery,
+                         flap_energy_cost):
+    """Advance the bird by a number of fixed timesteps using plain scalars
+
+    energy_recovery is the energy regained per step and yaw_sin/yaw_cos are
+    the cached sine and cosine of yaw. Returns the updated position (x, y, z),
+    rotation (pitch, yaw, roll), yaw sine and cosine, momentum (x, y, z),
+    speed, energy and on_ground flag.
+    """
+    # A flap is paid for once per update, then gives lift on every step
+    flapping = False
+    if flap and steps > 0:
+        energy_cost = flap_energy_cost * flap_intensity
+        if energy >= energy_cost:
+            energy -= energy_cost
+            flapping = True
+
+    for _ in range(steps):
+        # Handle turning
+        if turn == TURN_LEFT:
+            # Ensure yaw stays within 0-360 range
+            yaw = (yaw + turn_factor * turn_angle) % 360
+            # Banking effect (roll)
+            roll = min(25.0, 0.5 * turn_angle)
+        elif turn == TURN_RIGHT:
+            yaw = (yaw - turn_factor * turn_angle) % 360
+            # Banking effect (roll) - negative for right turn
+            roll = max(-25.0, -0.5 * turn_angle)
+        else:
+            # Gradually return roll to level
+            if abs(roll) > 1:
+                roll *= 0.95
+            else:
+                roll = 0.0
+
+        # Yaw only changes while turning, otherwise the cached sin/cos still hold
+        if turn != TURN_NONE:
+            yaw_rad = math.radians(yaw)
+            yaw_sin = math.sin(yaw_rad)
+            yaw_cos = math.cos(yaw_rad)
+
+        # Energy management
+        if flapping:
+            # Flapping provides vertical lift and forward thrust
+            if state == STATE_GAIN_HEIGHT:
+                # More upward momentum when trying to gain height
+                mom_y += 0.04 * flap_intensity * height_gain
+                speed += 0.005 * flap_intensity
+            else:
+                # Regular flapping provides some lift and speed
+                mom_y += 0.02 * flap_intensity
+                speed += 0.01 * flap_intensity
+        elif not flap:
+            # Energy recovery when not flapping
+            energy = min(energy_max, energy + energy_recovery)
+
+        # Apply physics based on bird state
+        if state == STATE_GLIDE:
+            # Gliding provides lift based on speed but gradually loses speed
+            mom_y += (lift_factor * speed - gravity)
+            speed = max(min_speed, speed - glide_drag)
+
+            # Set pitch based on vertical momentum for visual effect
+            target_pitch = -15.0 if mom_y > 0 else 15.0
+            pitch = pitch * 0.9 + target_pitch * 0.1
+
+        elif state == STATE_DIVE:
+            # Diving accelerates downward and increases speed
+            mom_y -= dive_acceleration * dive_intensity
+            speed = min(max_speed, speed + 0.02 * dive_intensity)
+
+            # Set steep downward pitch for diving
+            pitch = pitch * 0.8 + 40 * 0.2
+
+        elif state == STATE_GAIN_HEIGHT:
+            # Set upward pitch for gaining height
+            pitch = pitch * 0.8 + (-30) * 0.2
+
+        # Apply gravity
+        mom_y -= gravity
+
+        # Momentum decay (air resistance)
+        mom_x *= 0.95
+        mom_y *= 0.95
+        mom_z *= 0.95
+
+        # Move bird based on speed and rotation
+        x_move = yaw_sin * speed
+        z_move = yaw_cos * speed
+
+        x += x_move + mom_x
+        y += mom_y
+        z += z_move + mom_z
+
+        # Check if bird is on ground
+        if y <= 0:
+            y = 0.0
+            mom_y = 0.0
+
+            if not on_ground:
+                on_ground = True
+                # Reduce speed when landing
+                speed *= 0.5
+
+                # Reset momentum when landing
+                mom_x = 0.0
+                mom_y = 0.0
+                mom_z = 0.0
+        else:
+            on_ground = False
+
+        # Cap speed to min/max
+        speed = min(max(speed, min_speed), max_speed)
+
+    return x, y, z, pitch, yaw, roll, yaw_sin, yaw_cos, mom_x, mom_y, mom_z, speed, energy, on_ground
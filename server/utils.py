@@ -1,35 +1,32 @@
 import time
 import math
-import random
 import numpy as np
 from collections import deque
+from physics_kernel import apply_physics_kernel
+from common import STATE_NAMES, STATE_NONE, STATE_GLIDE, TURN_NONE
 
 # Movement smoothing
 class MovementSmoother:
-    def __init__(self, window_size=5):
-        self.window_size = window_size
-        self.command_history = {}
+    def __init__(self, alpha=0.6):
+        # Weight of the newest value, the rest comes from the running average
+        self.alpha = alpha
+        self.state = {}
         
     def smooth(self, commands):
-        """Apply smoothing to movement commands to prevent jittery movements"""
-        smoothed_commands = commands.copy()
+        """Smooth movement commands in place to prevent jittery movements"""
+        alpha = self.alpha
+        decay = 1 - alpha
+        state = self.state
         
         for key, value in commands.items():
-            if key not in self.command_history:
-                self.command_history[key] = deque(maxlen=self.window_size)
-            
-            # Only smooth numeric values
-            if isinstance(value, (int, float)):
-                self.command_history[key].append(value)
-                # Use a weighted average with more weight to recent values
-                weights = np.linspace(0.5, 1.0, len(self.command_history[key]))
-                weights = weights / np.sum(weights)  # Normalize weights
-                smoothed_value = 0
-                for i, val in enumerate(self.command_history[key]):
-                    smoothed_value += val * weights[i]
-                smoothed_commands[key] = smoothed_value
-        
-        return smoothed_commands
+            # Only smooth continuous values, not state/turn codes or flags
+            if isinstance(value, float):
+                # Exponential moving average, more weight to recent values
+                smoothed_value = alpha * value + decay * state.get(key, value)
+                state[key] = smoothed_value
+                commands[key] = smoothed_value
+        
+        return commands
 
 # Physics calculations
 class BirdPhysics:
@@ -47,132 +44,99 @@ class BirdPhysics:
         self.flap_energy_cost = 1.5
         
         # Bird state
-        self.position = [0, 5, 0]  # x, y (height), z
-        self.rotation = [0, 0, 0]  # pitch, yaw, roll
-        self.momentum = [0, 0, 0]  # x, y, z momentum
+        self.position = [0.0, 5.0, 0.0]  # x, y (height), z
+        self.rotation = [0.0, 0.0, 0.0]  # pitch, yaw, roll
+        # Sine and cosine of the yaw, only recomputed when the bird turns
+        self.yaw_sin = 0.0
+        self.yaw_cos = 1.0
+        # x, y, z momentum as plain floats, read on every step
+        self.mom_x = 0.0
+        self.mom_y = 0.0
+        self.mom_z = 0.0
         self.speed = 0.2
-        self.energy = self.energy_max
-        self.state = "glide"
+        self.energy = float(self.energy_max)
+        self.state = STATE_GLIDE  # Integer state code from common
         self.on_ground = False
         self.last_update = time.time()
         
-        # Smoothing for state changes
-        self.state_buffer = deque(["glide"] * 5, maxlen=5)
+        # Physics advances in fixed steps, carrying leftover time between updates
+        self.fixed_dt = 0.02
+        self.accumulator = 0.0
+        
+        # Smoothing for state changes, with per-state counts of the buffer contents
+        # indexed by state code
+        self.state_buffer = deque([STATE_GLIDE] * 5, maxlen=5)
+        self.state_counts = [0] * len(STATE_NAMES)
+        self.state_counts[STATE_GLIDE] = 5
         
     def update(self, commands):
+        # Read every command field once up front
+        current_state = commands.get("state", STATE_NONE)
+        turn = commands.get("turn", TURN_NONE)
+        turn_angle = float(commands.get("turn_angle", 0))
+        flap = bool(commands.get("flap", False))
+        flap_intensity = float(commands.get("flap_intensity", 0.5))
+        height_gain = float(commands.get("height_gain", 0.5))
+        dive_intensity = float(commands.get("dive_intensity", 0.5))
+        
         # Calculate time delta
         current_time = time.time()
         delta_time = min(current_time - self.last_update, 0.1)  # Cap to prevent large jumps
         self.last_update = current_time
         
+        # Work out how many whole fixed steps have accumulated
+        self.accumulator += delta_time
+        steps = int(self.accumulator / self.fixed_dt)
+        self.accumulator -= steps * self.fixed_dt
+        
         # Determine bird state from commands
-        current_state = commands.get("state", "none")
-        if current_state != "none":
+        if current_state != STATE_NONE:
+            # The buffer is always full, so appending evicts the oldest state
+            evicted = self.state_buffer[0]
             self.state_buffer.append(current_state)
             
-        # Use most common state in buffer to smooth transitions
-        self.state = max(set(self.state_buffer), key=self.state_buffer.count)
-        
-        # Handle turning
-        turn_direction = commands.get("turn", None)
-        turn_angle = commands.get("turn_angle", 0)
-        
-        if turn_direction == "left":
-            self.rotation[1] += self.turn_factor * turn_angle * delta_time * 50
-            # Banking effect (roll)
-            self.rotation[2] = min(25, 0.5 * turn_angle)
-        elif turn_direction == "right":
-            self.rotation[1] -= self.turn_factor * turn_angle * delta_time * 50
-            # Banking effect (roll) - negative for right turn
-            self.rotation[2] = max(-25, -0.5 * turn_angle)
-        else:
-            # Gradually return roll to level
-            if abs(self.rotation[2]) > 1:
-                self.rotation[2] *= 0.95
-            else:
-                self.rotation[2] = 0
-        
-        # Energy management
-        if "flap" in commands and commands["flap"]:
-            flap_intensity = commands.get("flap_intensity", 0.5)
-            energy_cost = self.flap_energy_cost * flap_intensity
-            
-            if self.energy >= energy_cost:
-                self.energy -= energy_cost
-                
-                # Flapping provides vertical lift and forward thrust
-                if self.state == "gain_height":
-                    # More upward momentum when trying to gain height
-                    height_gain = commands.get("height_gain", 0.5)
-                    self.momentum[1] += 0.04 * flap_intensity * height_gain * delta_time * 50
-                    self.speed += 0.005 * flap_intensity * delta_time * 50
-                else:
-                    # Regular flapping provides some lift and speed
-                    self.momentum[1] += 0.02 * flap_intensity * delta_time * 50
-                    self.speed += 0.01 * flap_intensity * delta_time * 50
-        else:
-            # Energy recovery when not flapping
-            self.energy = min(self.energy_max, self.energy + self.energy_recovery_rate * delta_time)
-        
-        # Apply physics based on bird state
-        if self.state == "glide":
-            # Gliding provides lift based on speed but gradually loses speed
-            self.momentum[1] += (self.lift_factor * self.speed - self.gravity) * delta_time * 50
-            self.speed = max(self.min_speed, self.speed - self.glide_drag * delta_time * 50)
-            
-            # Set pitch based on vertical momentum for visual effect
-            target_pitch = -15 if self.momentum[1] > 0 else 15
-            self.rotation[0] = self.rotation[0] * 0.9 + target_pitch * 0.1
-            
-        elif self.state == "dive":
-            # Diving accelerates downward and increases speed
-            dive_intensity = commands.get("dive_intensity", 0.5)
-            self.momentum[1] -= self.dive_acceleration * dive_intensity * delta_time * 50
-            self.speed = min(self.max_speed, self.speed + 0.02 * dive_intensity * delta_time * 50)
-            
-            # Set steep downward pitch for diving
-            self.rotation[0] = self.rotation[0] * 0.8 + 40 * 0.2
-            
-        elif self.state == "gain_height":
-            # Set upward pitch for gaining height
-            self.rotation[0] = self.rotation[0] * 0.8 + (-30) * 0.2
-        
-        # Apply gravity
-        self.momentum[1] -= self.gravity * delta_time * 50
-        
-        # Momentum decay (air resistance)
-        for i in range(3):
-            self.momentum[i] *= 0.95
-        
-        # Move bird based on speed and rotation
-        yaw_rad = math.radians(self.rotation[1])
-        x_move = math.sin(yaw_rad) * self.speed * delta_time * 50
-        z_move = math.cos(yaw_rad) * self.speed * delta_time * 50
-        
-        self.position[0] += x_move + self.momentum[0] * delta_time * 50
-        self.position[1] += self.momentum[1] * delta_time * 50
-        self.position[2] += z_move + self.momentum[2] * delta_time * 50
-        
-        # Check if bird is on ground
-        if self.position[1] <= 0:
-            self.position[1] = 0
-            self.momentum[1] = 0
-            
-            if not self.on_ground:
-                self.on_ground = True
-                # Reduce speed when landing
-                self.speed *= 0.5
+            # Use most common state in buffer to smooth transitions
+            if evicted != current_state:
+                state_counts = self.state_counts
+                state_counts[evicted] -= 1
+                state_counts[current_state] += 1
                 
-                # Reset momentum when landing
-                self.momentum = [0, 0, 0]
-        else:
-            self.on_ground = False
-        
-        # Cap speed to min/max
-        self.speed = min(max(self.speed, self.min_speed), self.max_speed)
-        
-        # Ensure yaw stays within 0-360 range
-        self.rotation[1] = self.rotation[1] % 360
+                if evicted == self.state:
+                    # The leader lost a vote, any state may have overtaken it
+                    leader = max(range(len(state_counts)), key=state_counts.__getitem__)
+                    if state_counts[leader] > state_counts[self.state]:
+                        self.state = leader
+                elif state_counts[current_state] > state_counts[self.state]:
+                    # Otherwise only the state that just gained a vote can take the lead
+                    self.state = current_state
+        
+        # Run the fixed steps in the compiled kernel
+        (self.position[0], self.position[1], self.position[2],
+         self.rotation[0], self.rotation[1], self.rotation[2],
+         self.yaw_sin, self.yaw_cos,
+         self.mom_x, self.mom_y, self.mom_z,
+         self.speed, self.energy, self.on_ground) = apply_physics_kernel(
+            steps,
+            self.state,
+            turn, turn_angle, flap, flap_intensity, height_gain, dive_intensity,
+            self.position[0], self.position[1], self.position[2],
+            self.rotation[0], self.rotation[1], self.rotation[2],
+            self.yaw_sin, self.yaw_cos,
+            self.mom_x, self.mom_y, self.mom_z,
+            self.speed, self.energy, self.on_ground,
+            self.gravity, self.max_speed, self.min_speed, self.glide_drag,
+            self.dive_acceleration, self.lift_factor, self.turn_factor,
+            float(self.energy_max), self.energy_recovery_rate * self.fixed_dt,
+            self.flap_energy_cost)
+        
+    @property
+    def momentum(self):
+        """Momentum as an [x, y, z] list, kept for older callers"""
+        return [self.mom_x, self.mom_y, self.mom_z]
+    
+    @momentum.setter
+    def momentum(self, value):
+        self.mom_x, self.mom_y, self.mom_z = (float(v) for v in value)
         
     def get_position(self):
         return self.position
@@ -199,13 +163,77 @@ class TimingUtility:
         # Cap delta time to prevent large jumps
         return min(delta, self.frame_time * 3)
 
+# Feature types are stored as small integer codes indexing these names
+TERRAIN_TYPES = ("mountain", "lake", "forest")
+OBSTACLE_TYPES = ("bird", "storm")
+COLLECTIBLE_TYPES = ("thermal", "food")
+TERRAIN_MOUNTAIN = 0
+
+# Per-type lookup tables, indexed by type code
+TERRAIN_COLORS = np.array([[0.6, 0.6, 0.6],   # Gray mountain
+                           [0.1, 0.3, 0.8],   # Blue lake
+                           [0.1, 0.5, 0.1]],  # Green forest
+                          dtype=np.float32)
+COLLECTIBLE_MAX_HEIGHT = np.array([40, 20])  # Thermal, food
+COLLECTIBLE_MIN_SIZE = np.array([5, 1])
+COLLECTIBLE_MAX_SIZE = np.array([15, 3])
+
+# Standard deviation of uniform(-1, 1), obstacle drift keeps the old spread
+OBSTACLE_DRIFT_SCALE = 1 / math.sqrt(3)
+
+# Arrays making up each feature pool, grown together when a pool fills up
+POOL_FIELDS = {
+    "terrain": ("terrain_xyz", "terrain_type", "terrain_size_arr", "terrain_height", "terrain_color", "terrain_live"),
+    "cloud": ("cloud_xyz", "cloud_size", "cloud_speed", "cloud_live"),
+    "obstacle": ("obstacle_xyz", "obstacle_type", "obstacle_size", "obstacle_speed", "obstacle_live"),
+    "collect": ("collect_xyz", "collect_type", "collect_size", "collect_value", "collect_live"),
+}
+
 class World:
     def __init__(self):
         self.terrain_size = 1000
-        self.terrain_features = []
-        self.clouds = []
-        self.obstacles = []
-        self.collectibles = []
+        
+        # One generator for all of the world's random numbers
+        self._rng = np.random.default_rng()
+        
+        # Distance thresholds are compared squared, so no sqrt is needed
+        self.max_distance_sq = (self.terrain_size / 2) ** 2  # Cleanup radius
+        self.view_distance = 300  # How far the bird can see
+        self.view_distance_sq = self.view_distance ** 2
+        
+        # Terrain and collectibles never move, so they are bucketed into a
+        # uniform grid of view_distance sized cells mapping cell -> row indices
+        self.grid_cell_size = self.view_distance
+        self.terrain_grid = {}
+        self.collect_grid = {}
+        
+        # Features are kept as parallel arrays (one slot per feature) so distance
+        # checks run as single vectorized operations. The arrays are preallocated
+        # pools, a *_live mask marks the used slots and removed slots get reused.
+        capacity = 64
+        self.terrain_xyz = np.zeros((capacity, 3), dtype=np.float32)
+        self.terrain_type = np.zeros(capacity, dtype=np.int8)
+        self.terrain_size_arr = np.zeros(capacity, dtype=np.float32)
+        self.terrain_height = np.zeros(capacity, dtype=np.float32)
+        self.terrain_color = np.zeros((capacity, 3), dtype=np.float32)
+        self.terrain_live = np.zeros(capacity, dtype=bool)
+        
+        self.cloud_xyz = np.zeros((capacity, 3), dtype=np.float32)
+        self.cloud_size = np.zeros(capacity, dtype=np.float32)
+        self.cloud_speed = np.zeros(capacity, dtype=np.float32)
+        self.cloud_live = np.zeros(capacity, dtype=bool)
+        
+        self.obstacle_xyz = np.zeros((capacity, 3), dtype=np.float32)
+        self.obstacle_type = np.zeros(capacity, dtype=np.int8)
+        self.obstacle_size = np.zeros(capacity, dtype=np.float32)
+        self.obstacle_speed = np.zeros(capacity, dtype=np.float32)
+        self.obstacle_live = np.zeros(capacity, dtype=bool)
+        
+        self.collect_xyz = np.zeros((capacity, 3), dtype=np.float32)
+        self.collect_type = np.zeros(capacity, dtype=np.int8)
+        self.collect_size = np.zeros(capacity, dtype=np.float32)
+        self.collect_value = np.zeros(capacity, dtype=np.float32)
+        self.collect_live = np.zeros(capacity, dtype=bool)
         
         # Generate initial world features
         self._generate_terrain_features(20)
@@ -216,76 +244,91 @@ class World:
         # Track player's region for feature generation
         self.last_region = (0, 0)
         
+    def _claim_slots(self, pool, count):
+        """Mark count free slots of a pool as live and return their indices"""
+        live = getattr(self, pool + "_live")
+        slots = np.flatnonzero(~live)[:count]
+        
+        if len(slots) < count:
+            # Pool is full, at least double every array in it
+            capacity = len(live) + max(len(live), count)
+            for name in POOL_FIELDS[pool]:
+                old = getattr(self, name)
+                grown = np.zeros((capacity,) + old.shape[1:], dtype=old.dtype)
+                grown[:len(old)] = old
+                setattr(self, name, grown)
+            live = getattr(self, pool + "_live")
+            slots = np.flatnonzero(~live)[:count]
+        
+        live[slots] = True
+        return slots
+    
     def _generate_terrain_features(self, count):
         """Generate terrain features like mountains and lakes"""
-        for _ in range(count):
-            feature_type = random.choice(["mountain", "lake", "forest"])
-            x = random.uniform(-self.terrain_size/2, self.terrain_size/2)
-            z = random.uniform(-self.terrain_size/2, self.terrain_size/2)
-            size = random.uniform(5, 30)
-            height = random.uniform(5, 25) if feature_type == "mountain" else 0
-            
-            self.terrain_features.append({
-                "type": feature_type,
-                "position": [x, 0, z],
-                "size": size,
-                "height": height,
-                "color": self._get_feature_color(feature_type)
-            })
+        rng = self._rng
+        half_size = self.terrain_size / 2
+        
+        types = rng.integers(0, len(TERRAIN_TYPES), count).astype(np.int8)
+        positions = np.zeros((count, 3), dtype=np.float32)
+        positions[:, ::2] = rng.uniform(-half_size, half_size, (count, 2))
+        sizes = rng.uniform(5, 30, count).astype(np.float32)
+        # Only mountains have height
+        heights = np.where(types == TERRAIN_MOUNTAIN, rng.uniform(5, 25, count), 0).astype(np.float32)
+        
+        slots = self._claim_slots("terrain", count)
+        self.terrain_type[slots] = types
+        self.terrain_xyz[slots] = positions
+        self.terrain_size_arr[slots] = sizes
+        self.terrain_height[slots] = heights
+        self.terrain_color[slots] = TERRAIN_COLORS[types]
+        self._grid_insert(self.terrain_grid, self.terrain_xyz, slots)
     
     def _generate_clouds(self, count):
         """Generate clouds at various heights"""
-        for _ in range(count):
-            x = random.uniform(-self.terrain_size/2, self.terrain_size/2)
-            y = random.uniform(30, 100)
-            z = random.uniform(-self.terrain_size/2, self.terrain_size/2)
-            size = random.uniform(10, 30)
-            
-            self.clouds.append({
-                "position": [x, y, z],
-                "size": size,
-                "speed": random.uniform(0.01, 0.05)
-            })
+        rng = self._rng
+        half_size = self.terrain_size / 2
+        
+        positions = np.empty((count, 3), dtype=np.float32)
+        positions[:, ::2] = rng.uniform(-half_size, half_size, (count, 2))
+        positions[:, 1] = rng.uniform(30, 100, count)
+        
+        slots = self._claim_slots("cloud", count)
+        self.cloud_xyz[slots] = positions
+        self.cloud_size[slots] = rng.uniform(10, 30, count)
+        self.cloud_speed[slots] = rng.uniform(0.01, 0.05, count)
     
     def _generate_obstacles(self, count):
         """Generate obstacles like birds or weather patterns"""
-        for _ in range(count):
-            obstacle_type = random.choice(["bird", "storm"])
-            x = random.uniform(-self.terrain_size/2, self.terrain_size/2)
-            y = random.uniform(15, 60)
-            z = random.uniform(-self.terrain_size/2, self.terrain_size/2)
-            
-            self.obstacles.append({
-                "type": obstacle_type,
-                "position": [x, y, z],
-                "size": random.uniform(2, 8),
-                "speed": random.uniform(0.05, 0.2)
-            })
+        rng = self._rng
+        half_size = self.terrain_size / 2
+        
+        positions = np.empty((count, 3), dtype=np.float32)
+        positions[:, ::2] = rng.uniform(-half_size, half_size, (count, 2))
+        positions[:, 1] = rng.uniform(15, 60, count)
+        
+        slots = self._claim_slots("obstacle", count)
+        self.obstacle_type[slots] = rng.integers(0, len(OBSTACLE_TYPES), count)
+        self.obstacle_xyz[slots] = positions
+        self.obstacle_size[slots] = rng.uniform(2, 8, count)
+        self.obstacle_speed[slots] = rng.uniform(0.05, 0.2, count)
     
     def _generate_collectibles(self, count):
         """Generate collectibles like thermal updrafts or food"""
-        for _ in range(count):
-            collectible_type = random.choice(["thermal", "food"])
-            x = random.uniform(-self.terrain_size/2, self.terrain_size/2)
-            y = random.uniform(5, 40) if collectible_type == "thermal" else random.uniform(5, 20)
-            z = random.uniform(-self.terrain_size/2, self.terrain_size/2)
-            
-            self.collectibles.append({
-                "type": collectible_type,
-                "position": [x, y, z],
-                "size": random.uniform(5, 15) if collectible_type == "thermal" else random.uniform(1, 3),
-                "value": random.uniform(10, 30)
-            })
-    
-    def _get_feature_color(self, feature_type):
-        """Return color for different terrain features"""
-        if feature_type == "mountain":
-            return [0.6, 0.6, 0.6]  # Gray
-        elif feature_type == "lake":
-            return [0.1, 0.3, 0.8]  # Blue
-        elif feature_type == "forest":
-            return [0.1, 0.5, 0.1]  # Green
-        return [0.5, 0.5, 0.5]  # Default gray
+        rng = self._rng
+        half_size = self.terrain_size / 2
+        
+        types = rng.integers(0, len(COLLECTIBLE_TYPES), count).astype(np.int8)
+        # Thermals sit higher and are wider than food
+        positions = np.empty((count, 3), dtype=np.float32)
+        positions[:, ::2] = rng.uniform(-half_size, half_size, (count, 2))
+        positions[:, 1] = rng.uniform(5, COLLECTIBLE_MAX_HEIGHT[types])
+        
+        slots = self._claim_slots("collect", count)
+        self.collect_type[slots] = types
+        self.collect_xyz[slots] = positions
+        self.collect_size[slots] = rng.uniform(COLLECTIBLE_MIN_SIZE[types], COLLECTIBLE_MAX_SIZE[types])
+        self.collect_value[slots] = rng.uniform(10, 30, count)
+        self._grid_insert(self.collect_grid, self.collect_xyz, slots)
     
     def update(self, bird_physics):
         """Update world state based on bird position"""
@@ -307,99 +350,147 @@ class World:
             
             self.last_region = current_region
         
-        # Update cloud positions
-        for cloud in self.clouds:
-            cloud["position"][0] += cloud["speed"]
-            # Wrap clouds around the world
-            if cloud["position"][0] > self.terrain_size/2:
-                cloud["position"][0] = -self.terrain_size/2
-        
-        # Update obstacle positions
-        for obstacle in self.obstacles:
-            # Move obstacles randomly
-            obstacle["position"][0] += random.uniform(-1, 1) * obstacle["speed"]
-            obstacle["position"][2] += random.uniform(-1, 1) * obstacle["speed"]
-            
-            # Keep obstacles within world bounds
-            for i in [0, 2]:
-                if obstacle["position"][i] > self.terrain_size/2:
-                    obstacle["position"][i] = self.terrain_size/2
-                elif obstacle["position"][i] < -self.terrain_size/2:
-                    obstacle["position"][i] = -self.terrain_size/2
+        half_size = self.terrain_size / 2
+        
+        # Update cloud positions (free slots move too, they are simply ignored)
+        cloud_x = self.cloud_xyz[:, 0]
+        cloud_x += self.cloud_speed
+        # Wrap clouds around the world
+        np.mod(cloud_x + half_size, self.terrain_size, out=cloud_x)
+        cloud_x -= half_size
+        
+        # Update obstacle positions (x and z columns, as a strided view)
+        obstacle_xz = self.obstacle_xyz[:, ::2]
+        # Move obstacles randomly, normal steps with the spread of uniform(-1, 1) * speed
+        drift = self._rng.standard_normal(obstacle_xz.shape)
+        drift *= (self.obstacle_speed * OBSTACLE_DRIFT_SCALE)[:, None]
+        obstacle_xz += drift
+        
+        # Keep obstacles within world bounds
+        np.clip(obstacle_xz, -half_size, half_size, out=obstacle_xz)
         
         # Check for collectible collisions
-        for i, collectible in enumerate(self.collectibles):
-            # Calculate distance to bird
-            dx = collectible["position"][0] - bird_pos[0]
-            dy = collectible["position"][1] - bird_pos[1]
-            dz = collectible["position"][2] - bird_pos[2]
-            distance = math.sqrt(dx*dx + dy*dy + dz*dz)
+        # Compare squared distance to bird against the squared pickup radius
+        # Only collectibles in the cells around the bird can be in reach
+        nearby = self._grid_query(self.collect_grid, bird_pos)
+        distance_sq = self._distance_3d_sq(self.collect_xyz[nearby], bird_pos)
+        reach = self.collect_size[nearby] + 2
+        hits = nearby[distance_sq < reach * reach]
+        
+        # If bird is close enough, apply effect
+        if len(hits):
+            i = hits[0]
+            if COLLECTIBLE_TYPES[self.collect_type[i]] == "thermal":
+                # Thermal updraft gives vertical momentum
+                bird_physics.mom_y += 0.1
+            elif COLLECTIBLE_TYPES[self.collect_type[i]] == "food":
+                # Food restores energy
+                bird_physics.energy = min(float(bird_physics.energy_max), 
+                                         bird_physics.energy + float(self.collect_value[i]))
             
-            # If bird is close enough, apply effect
-            if distance < collectible["size"] + 2:
-                if collectible["type"] == "thermal":
-                    # Thermal updraft gives vertical momentum
-                    bird_physics.momentum[1] += 0.1
-                elif collectible["type"] == "food":
-                    # Food restores energy
-                    bird_physics.energy = min(bird_physics.energy_max, 
-                                             bird_physics.energy + collectible["value"])
-                
-                # Remove collected item
-                self.collectibles.pop(i)
-                # Generate a new one
-                self._generate_collectibles(1)
-                break
+            # Remove collected item, freeing its slot
+            self._grid_remove(self.collect_grid, self.collect_xyz, i)
+            self.collect_live[i] = False
+            # Generate a new one
+            self._generate_collectibles(1)
         
         # Return relevant world data near the bird
         return self._get_nearby_world_data(bird_pos)
     
     def _cleanup_distant_features(self, bird_pos):
-        """Remove features that are too far from the bird"""
-        max_distance = self.terrain_size / 2
-        
-        # Filter terrain features
-        self.terrain_features = [f for f in self.terrain_features 
-                                if self._distance_2d(f["position"], bird_pos) < max_distance]
-        
-        # Filter clouds
-        self.clouds = [c for c in self.clouds 
-                      if self._distance_3d(c["position"], bird_pos) < max_distance]
-        
-        # Filter obstacles
-        self.obstacles = [o for o in self.obstacles 
-                         if self._distance_3d(o["position"], bird_pos) < max_distance]
-        
-        # Filter collectibles
-        self.collectibles = [c for c in self.collectibles 
-                            if self._distance_3d(c["position"], bird_pos) < max_distance]
+        """Free the slots of features that are too far from the bird"""
+        max_distance_sq = self.max_distance_sq
+        
+        # Free terrain features, also dropping them from the grid
+        drop = self.terrain_live & (self._distance_2d_sq(self.terrain_xyz, bird_pos) >= max_distance_sq)
+        for i in np.flatnonzero(drop).tolist():
+            self._grid_remove(self.terrain_grid, self.terrain_xyz, i)
+        self.terrain_live &= ~drop
+        
+        # Free clouds
+        self.cloud_live &= self._distance_3d_sq(self.cloud_xyz, bird_pos) < max_distance_sq
+        
+        # Free obstacles
+        self.obstacle_live &= self._distance_3d_sq(self.obstacle_xyz, bird_pos) < max_distance_sq
+        
+        # Free collectibles
+        drop = self.collect_live & (self._distance_3d_sq(self.collect_xyz, bird_pos) >= max_distance_sq)
+        for i in np.flatnonzero(drop).tolist():
+            self._grid_remove(self.collect_grid, self.collect_xyz, i)
+        self.collect_live &= ~drop
     
-    def _distance_2d(self, pos1, pos2):
-        """Calculate 2D distance (x,z plane)"""
-        dx = pos1[0] - pos2[0]
-        dz = pos1[2] - pos2[2]
-        return math.sqrt(dx*dx + dz*dz)
+    def _grid_cell(self, x, z):
+        """Return the grid cell containing the point (x, z)"""
+        return (math.floor(x / self.grid_cell_size), math.floor(z / self.grid_cell_size))
     
-    def _distance_3d(self, pos1, pos2):
-        """Calculate 3D distance"""
-        dx = pos1[0] - pos2[0]
-        dy = pos1[1] - pos2[1]
-        dz = pos1[2] - pos2[2]
-        return math.sqrt(dx*dx + dy*dy + dz*dz)
+    def _grid_insert(self, grid, xyz, indices):
+        """Add the given rows of xyz to their grid cells"""
+        cells = np.floor(xyz[indices, ::2] / self.grid_cell_size).astype(np.int64)
+        for i, (cx, cz) in zip(indices.tolist(), cells.tolist()):
+            grid.setdefault((cx, cz), []).append(i)
+    
+    def _grid_remove(self, grid, xyz, i):
+        """Take row i of xyz out of its grid cell"""
+        cx, cz = np.floor(xyz[i, ::2] / self.grid_cell_size).astype(np.int64).tolist()
+        grid[(cx, cz)].remove(i)
+    
+    def _grid_query(self, grid, pos):
+        """Return sorted row indices in the cell containing pos and its 8 neighbours"""
+        cx, cz = self._grid_cell(pos[0], pos[2])
+        indices = []
+        for dx in (-1, 0, 1):
+            for dz in (-1, 0, 1):
+                indices.extend(grid.get((cx + dx, cz + dz), ()))
+        indices.sort()
+        return np.array(indices, dtype=np.intp)
+    
+    def _distance_2d_sq(self, xyz, pos):
+        """Squared 2D distance (x,z plane) from every row of xyz to pos"""
+        dx = xyz[:, 0] - pos[0]
+        dz = xyz[:, 2] - pos[2]
+        return dx*dx + dz*dz
+    
+    def _distance_3d_sq(self, xyz, pos):
+        """Squared 3D distance from every row of xyz to pos"""
+        diff = xyz - np.asarray(pos, dtype=np.float32)
+        return (diff * diff).sum(axis=1)
     
     def _get_nearby_world_data(self, bird_pos):
         """Return only world data that's near the bird"""
-        view_distance = 300  # How far the bird can see
-        
+        view_distance_sq = self.view_distance_sq
+        
+        # Terrain and collectibles are narrowed to the grid cells around the bird first
+        terrain = self._grid_query(self.terrain_grid, bird_pos)
+        terrain = terrain[self._distance_2d_sq(self.terrain_xyz[terrain], bird_pos) < view_distance_sq]
+        clouds = np.flatnonzero(self.cloud_live &
+                                (self._distance_3d_sq(self.cloud_xyz, bird_pos) < view_distance_sq))
+        obstacles = np.flatnonzero(self.obstacle_live &
+                                   (self._distance_3d_sq(self.obstacle_xyz, bird_pos) < view_distance_sq))
+        collectibles = self._grid_query(self.collect_grid, bird_pos)
+        collectibles = collectibles[self._distance_3d_sq(self.collect_xyz[collectibles], bird_pos) < view_distance_sq]
+        
+        # Only the visible rows are turned into dicts for the client
         nearby_data = {
-            "terrain": [f for f in self.terrain_features 
-                       if self._distance_2d(f["position"], bird_pos) < view_distance],
-            "clouds": [c for c in self.clouds 
-                      if self._distance_3d(c["position"], bird_pos) < view_distance],
-            "obstacles": [o for o in self.obstacles 
-                         if self._distance_3d(o["position"], bird_pos) < view_distance],
-            "collectibles": [c for c in self.collectibles 
-                            if self._distance_3d(c["position"], bird_pos) < view_distance]
+            "terrain": [{"type": TERRAIN_TYPES[t], "position": p, "size": s, "height": h, "color": c}
+                        for t, p, s, h, c in zip(self.terrain_type[terrain].tolist(),
+                                                 self.terrain_xyz[terrain].tolist(),
+                                                 self.terrain_size_arr[terrain].tolist(),
+                                                 self.terrain_height[terrain].tolist(),
+                                                 self.terrain_color[terrain].tolist())],
+            "clouds": [{"position": p, "size": s, "speed": v}
+                       for p, s, v in zip(self.cloud_xyz[clouds].tolist(),
+                                          self.cloud_size[clouds].tolist(),
+                                          self.cloud_speed[clouds].tolist())],
+            "obstacles": [{"type": OBSTACLE_TYPES[t], "position": p, "size": s, "speed": v}
+                          for t, p, s, v in zip(self.obstacle_type[obstacles].tolist(),
+                                                self.obstacle_xyz[obstacles].tolist(),
+                                                self.obstacle_size[obstacles].tolist(),
+                                                self.obstacle_speed[obstacles].tolist())],
+            "collectibles": [{"type": COLLECTIBLE_TYPES[t], "position": p, "size": s, "value": v}
+                             for t, p, s, v in zip(self.collect_type[collectibles].tolist(),
+                                                   self.collect_xyz[collectibles].tolist(),
+                                                   self.collect_size[collectibles].tolist(),
+                                                   self.collect_value[collectibles].tolist())]
         }
         
         return nearby_data